@@ -4,7 +4,6 @@ Moved to infrastructure layer for microservices architecture.
 """
 
 from langchain.prompts import PromptTemplate
-from langfuse import Langfuse
 from infrastructure.config.settings import get_langfuse_config
 from services.ai_service.domain_content import get_traite_summary
 import streamlit as st
@@ -59,6 +58,9 @@ def get_langfuse_prompt(prompt_name: str = "caracterologie_qa", version: int = N
         if not config["secret_key"] or not config["public_key"]:
             raise ValueError("Langfuse keys not configured")
         
+        # Imported on first use so startup doesn't load the Langfuse SDK
+        from langfuse import Langfuse
+        
         langfuse = Langfuse(
             secret_key=config["secret_key"],
             public_key=config["public_key"],
@@ -133,6 +133,9 @@ class MemoryConfig:
     """Memory management configuration"""
     max_token_limit: int = 4000
     model_name: str = "gpt-4o-mini"  # For token counting
+    # Conversations kept in memory across all sessions (the repository is shared); each
+    # is bounded by max_token_limit, so the cap only needs to cover concurrent sessions
+    max_cached_threads: int = 128
 
 
 @dataclass
@@ -151,7 +154,7 @@ class LangGraphConfig:
 class StreamingConfig:
     """Streaming response configuration"""
     update_every: int = 1
-    delay: float = 0.01
+    min_paint_interval: float = 1 / 60  # Minimum seconds between repaints of the streamed answer
 
 
 @dataclass
@@ -170,6 +173,11 @@ Que vous soyez novice ou déjà initié, je peux vous aider à :
 
 Pour commencer, vous pouvez choisir une des suggestions ci-dessous ou me poser directement votre question :"""
     
+    # Most recent messages rendered per rerun (older ones are shown on demand)
+    max_rendered_messages: int = 50
+    # Messages kept per conversation in session state (oldest dropped first)
+    max_session_messages: int = 1000
+    
     templated_prompts: List[Dict[str, str]] = field(default_factory=lambda: [
         {
             "id": "beginner",
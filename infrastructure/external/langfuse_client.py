@@ -3,14 +3,21 @@ Langfuse client adapter for the application.
 Handles Langfuse integration for observability and prompt management.
 """
 
-from langfuse import Langfuse
-from langfuse.langchain import CallbackHandler
-from typing import Optional
+from typing import Optional, TYPE_CHECKING
+import time
 import streamlit as st
 
 from infrastructure.config.settings import get_config, get_langfuse_config
 from infrastructure.monitoring.logging_service import get_logger
 
+if TYPE_CHECKING:
+    # The Langfuse SDK is imported on first use so startup doesn't pay for it
+    from langfuse import Langfuse
+    from langfuse.langchain import CallbackHandler
+
+# Seconds to wait before retrying a failed Langfuse client initialization
+INIT_RETRY_SECONDS = 60
+
 
 class LangfuseClient:
     """
@@ -23,8 +30,10 @@ class LangfuseClient:
         self.config = get_config()
         self._client = None
         self._callback_handler = None
+        # Monotonic deadline before which get_client() skips initialization
+        self._client_unavailable_until = 0.0
     
-    def get_client(self) -> Optional[Langfuse]:
+    def get_client(self) -> Optional["Langfuse"]:
         """
         Get configured Langfuse client
         
@@ -32,14 +41,22 @@ class LangfuseClient:
             Optional[Langfuse]: Configured client or None if not available
         """
         if self._client is None:
+            # Remember that Langfuse is unavailable instead of retrying on every rerun
+            if time.monotonic() < self._client_unavailable_until:
+                return None
+            
             try:
                 langfuse_config = get_langfuse_config()
                 
                 # Check if keys are available
                 if not langfuse_config["secret_key"] or not langfuse_config["public_key"]:
                     self.logger.debug("Langfuse keys not configured, skipping initialization")
+                    # Keys come from the process-wide config, so this won't change
+                    self._client_unavailable_until = float("inf")
                     return None
                 
+                from langfuse import Langfuse
+                
                 self._client = Langfuse(
                     secret_key=langfuse_config["secret_key"],
                     public_key=langfuse_config["public_key"],
@@ -50,11 +67,12 @@ class LangfuseClient:
                 
             except Exception as e:
                 self.logger.warning(f"Failed to initialize Langfuse client: {e}")
+                self._client_unavailable_until = time.monotonic() + INIT_RETRY_SECONDS
                 return None
         
         return self._client
     
-    def get_callback_handler(self) -> Optional[CallbackHandler]:
+    def get_callback_handler(self) -> Optional["CallbackHandler"]:
         """
         Get Langfuse callback handler for LangChain integration
         
@@ -67,6 +85,8 @@ class LangfuseClient:
                 if client is None:
                     return None
                 
+                from langfuse.langchain import CallbackHandler
+                
                 self._callback_handler = CallbackHandler()
                 self.logger.debug("Langfuse callback handler created")
                 
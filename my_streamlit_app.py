@@ -12,7 +12,7 @@ from infrastructure.config.settings import get_config
 from infrastructure.monitoring.logging_service import get_logger
 
 # Infrastructure and service imports
-from infrastructure.resilience.retry_service import retry_with_circuit_breaker, RetryStatus, CircuitBreakerError, get_openai_circuit_breaker
+from infrastructure.resilience.retry_service import retry_with_circuit_breaker, RetryStatus, CircuitBreakerError, get_openai_circuit_breaker, exponential_backoff_delay
 from services.ai_service.fallback_service import generate_fallback_response, get_fallback_system
 from services.ui_service.callback_handlers import RetrievalCallbackHandler
 from services.ui_service.chunks_renderer import ChunksCollector
@@ -33,7 +33,7 @@ error_tracker = get_error_tracker()
 
 def main_app():
     """Main application content (protected by authentication)"""
-    # Add responsive CSS for mobile devices
+    # Add responsive CSS for mobile devices and the enhanced header in a single element
     st.markdown("""
     <style>
     /* Mobile responsiveness */
@@ -85,17 +85,14 @@ def main_app():
         box-shadow: 0 0 0 2px rgba(33, 150, 243, 0.2);
     }
     </style>
+    <div class="main-header"><h1>🧠 CarIActérologie</h1><p>AI-powered Characterology Assistant</p></div>
     """, unsafe_allow_html=True)
-    
-    # Initialize the app with enhanced header
-    st.markdown('<div class="main-header"><h1>🧠 CarIActérologie</h1><p>AI-powered Characterology Assistant</p></div>', unsafe_allow_html=True)
     logger.info("Application started")
 
     # Initialize conversations with loading state
     try:
-        with st.status("Initializing conversations...", expanded=False) as status:
+        with st.spinner("Initializing conversations..."):
             conversation_manager.initialize_conversations()
-            status.update(label="✅ Conversations loaded", state="complete")
         logger.info("Conversations initialized successfully")
     except Exception as e:
         error_tracker.track_error(e, "conversation_initialization")
@@ -108,23 +105,24 @@ def main_app():
     # Render conversation sidebar
     chat_interface.render_conversation_sidebar()
 
-    # Get current conversation messages and memory
-    messages = conversation_manager.get_current_messages()
+    # Get the most recent window of the current conversation's messages and memory
+    history_limit = conversation_manager.get_message_window()
+    messages = conversation_manager.get_current_messages(limit=history_limit)
     current_memory = conversation_manager.get_current_memory()
 
     # Get selected collection
     selected_collection = chat_interface.get_selected_collection()
 
-    # Set up QA system
-    with st.spinner(f"Setting up AI system with {selected_collection} collection..."):
-        pass  # QA engine is already initialized
-
     # Show welcome message if this is a new conversation
     if conversation_manager.should_show_welcome_message():
         chat_interface.render_welcome_message()
 
     # Always render existing chat messages (if any)
     if messages:
+        if conversation_manager.get_current_message_count() > history_limit:
+            if st.button("⬆️ Show earlier messages", use_container_width=True):
+                conversation_manager.expand_message_window()
+                st.rerun()
         chat_interface.render_chat_messages(messages)
 
     # Check for pending prompt from welcome buttons
@@ -137,6 +135,7 @@ def main_app():
         # Initialize variables at the top to avoid UnboundLocalError in exception handlers
         retry_status = RetryStatus()
         chunks_collector = ChunksCollector()
+        current_conversation = conversation_manager.get_current_conversation()
         
         try:
             # Log user interaction
@@ -144,7 +143,7 @@ def main_app():
                 logger, 
                 "query_submitted", 
                 query_length=len(prompt_input),
-                conversation=conversation_manager.get_current_conversation()
+                conversation=current_conversation
             )
             
             # Add user message to conversation
@@ -158,16 +157,14 @@ def main_app():
             assistant_msg = st.chat_message("assistant")
             stream_placeholder = assistant_msg.empty()
             
-            # Show enhanced loading indicator with status
-            with stream_placeholder.container():
-                loading_status = st.status("🤔 Analyzing your question...", expanded=False)
-                with loading_status:
-                    st.write("🔍 Processing query...")
-                    st.write("📚 Searching knowledge base...")
-                    st.write("🧠 Generating response...")
+            # Time to first token is shown as a caption under the answer
+            ttft_placeholder = assistant_msg.empty()
+            
+            # Show a single loading message until the first token replaces it
+            stream_placeholder.markdown("🤔 Analyzing your question...")
             
             # Create streaming handler
-            stream_handler = chat_interface.create_stream_handler(stream_placeholder)
+            stream_handler = chat_interface.create_stream_handler(stream_placeholder, ttft_placeholder)
             
             # Create retrieval callback handler with memory and chunks collector
             retrieval_handler = RetrievalCallbackHandler(memory=current_memory, chunks_collector=chunks_collector)
@@ -198,18 +195,13 @@ def main_app():
                 
                 def on_retry_callback(attempt: int, error: Exception):
                     """Show retry status to user"""
-                    from infrastructure.resilience.retry_service import exponential_backoff_delay
                     next_delay = exponential_backoff_delay(attempt - 1)  # attempt is 1-indexed in callback
                     
                     retry_status.on_retry_attempt(attempt, error, next_delay)
                     retry_message = retry_status.get_status_message()
                     
-                    # Show retry message to user
+                    # Show retry message to user (stays visible during the backoff delay)
                     retry_status_placeholder.markdown(retry_message)
-                    
-                    # Brief pause to show the message
-                    import time
-                    time.sleep(0.5)
                 
                 # Start retry tracking
                 retry_status.start_retry(max_attempts=3)
@@ -246,7 +238,7 @@ def main_app():
             # Log successful response
             logger.info("Response generated successfully", extra={
                 "response_length": len(cleaned_answer),
-                "conversation": conversation_manager.get_current_conversation()
+                "conversation": current_conversation
             })
             
         except CircuitBreakerError as e:
@@ -13,6 +13,9 @@ from infrastructure.monitoring.logging_service import get_logger
 
 logger = get_logger(__name__)
 
+# Accent folding table used to normalize questions in a single pass
+ACCENT_TRANSLATION = str.maketrans("éèêàçôû", "eeeacou")
+
 
 class CharacterologyFallbackSystem:
     """
@@ -189,13 +192,8 @@ class CharacterologyFallbackSystem:
         """
         Analyze question to determine the best fallback response type
         """
-        question_lower = question.lower()
-        
-        # Remove accents for better matching
-        question_normalized = (question_lower
-                             .replace('é', 'e').replace('è', 'e').replace('ê', 'e')
-                             .replace('à', 'a').replace('ç', 'c')
-                             .replace('ô', 'o').replace('û', 'u'))
+        # Lowercase and remove accents for better matching
+        question_normalized = question.lower().translate(ACCENT_TRANSLATION)
         
         # Question type detection patterns
         if any(word in question_normalized for word in ['qu\'est-ce', 'definition', 'c\'est quoi']):
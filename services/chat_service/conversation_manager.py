@@ -5,14 +5,40 @@ Refactored from utils/conversation_manager.py into a service-oriented architectu
 
 import streamlit as st
 from datetime import datetime
-from typing import Optional, Dict, List
+from functools import lru_cache
+from typing import Optional, Dict, List, Tuple
+import threading
 import uuid
 
-from services.chat_service.models import Conversation, Message, ConversationSummary
 from services.chat_service.memory_repository import get_memory_repository
+from services.simple_user_session import get_current_user_id
+from infrastructure.config.settings import get_config
 from infrastructure.monitoring.logging_service import get_logger
 
 
+@lru_cache(maxsize=256)
+def _build_session_keys(user_id: Optional[str]) -> Tuple[str, str, str, str]:
+    """
+    Build the session state keys for a user once and reuse them on later calls.
+    Every per-user key this module writes is listed here so reset_session_state clears them all.
+    
+    Args:
+        user_id: Current user ID (None or empty for guest/unauthenticated users)
+        
+    Returns:
+        Tuple of (conversations_key, manager_key, current_conversation_key, initialized_key)
+    """
+    if user_id:
+        return (
+            f"conversations_{user_id}",
+            f"langgraph_manager_{user_id}",
+            f"current_conversation_{user_id}",
+            f"conversations_{user_id}_initialized"
+        )
+    # Fallback for guest/unauthenticated users
+    return ("conversations", "langgraph_manager", "current_conversation_guest", "conversations_initialized")
+
+
 class ConversationManager:
     """
     Service for managing conversation state and operations.
@@ -21,11 +47,11 @@ class ConversationManager:
     
     def __init__(self):
         self.logger = get_logger(__name__)
+        self.config = get_config()
         self.memory_repository = get_memory_repository()
     
     def _get_current_user_id(self) -> Optional[str]:
         """Get current user ID from simple user session"""
-        from services.simple_user_session import get_current_user_id
         return get_current_user_id()
     
     def _get_user_conversations_key(self, user_id: Optional[str] = None) -> str:
@@ -33,46 +59,47 @@ class ConversationManager:
         if user_id is None:
             user_id = self._get_current_user_id()
         
-        if user_id:
-            return f"conversations_{user_id}"
-        else:
-            return "conversations"  # Fallback for guest/unauthenticated users
+        return _build_session_keys(user_id)[0]
     
-    def _get_user_langgraph_manager_key(self, user_id: Optional[str] = None) -> str:
-        """Get the session state key for user's LangGraph manager"""
+    def _get_current_conversation_key(self, user_id: Optional[str] = None) -> str:
+        """Get the session state key for user's current conversation name"""
         if user_id is None:
             user_id = self._get_current_user_id()
         
-        if user_id:
-            return f"langgraph_manager_{user_id}"
-        else:
-            return "langgraph_manager"  # Fallback for guest/unauthenticated users
+        return _build_session_keys(user_id)[2]
+    
+    def _resolve_keys(self) -> Tuple[str, str, str, str]:
+        """
+        Resolve all session state keys for the current user with a single user lookup
+        
+        Returns:
+            Tuple of (conversations_key, manager_key, current_conversation_key, initialized_key)
+        """
+        return _build_session_keys(self._get_current_user_id())
     
     def initialize_conversations(self):
         """Initialize conversation system for current user"""
         try:
-            user_id = self._get_current_user_id()
-            conversations_key = self._get_user_conversations_key(user_id)
-            manager_key = self._get_user_langgraph_manager_key(user_id)
-            current_conversation_key = f"current_conversation_{user_id or 'guest'}"
+            conversations_key, manager_key, current_conversation_key, initialized_key = self._resolve_keys()
+            
+            # Steady state: already initialized on an earlier rerun
+            if st.session_state.get(initialized_key):
+                return
             
             # Initialize LangGraph memory manager
-            if manager_key not in st.session_state:
-                st.session_state[manager_key] = self.memory_repository
+            st.session_state.setdefault(manager_key, self.memory_repository)
             
             # Initialize conversations dict
-            if conversations_key not in st.session_state:
-                st.session_state[conversations_key] = {}
+            conversations = st.session_state.setdefault(conversations_key, {})
             
             # Initialize current conversation
-            if current_conversation_key not in st.session_state:
-                st.session_state[current_conversation_key] = "conversation 1"
+            st.session_state.setdefault(current_conversation_key, "conversation 1")
             
             # Create default conversation if none exist
-            conversations = st.session_state[conversations_key]
             if not conversations:
                 self.create_new_conversation("conversation 1")
             
+            st.session_state[initialized_key] = True
             self.logger.info("Conversations initialized successfully")
             
         except Exception as e:
@@ -90,37 +117,30 @@ class ConversationManager:
             Conversation name/key
         """
         try:
-            user_id = self._get_current_user_id()
-            conversations_key = self._get_user_conversations_key(user_id)
-            manager_key = self._get_user_langgraph_manager_key(user_id)
+            conversations_key, manager_key, _, _ = self._resolve_keys()
             
             # Get or create manager
-            if manager_key not in st.session_state:
-                st.session_state[manager_key] = self.memory_repository
-            
-            manager = st.session_state[manager_key]
+            st.session_state.setdefault(manager_key, self.memory_repository)
+            conversations = st.session_state.setdefault(conversations_key, {})
             
             # Generate conversation name if not provided
             if not conversation_name:
-                conversations = st.session_state.get(conversations_key, {})
                 conversation_name = f"conversation {len(conversations) + 1}"
             
-            # Create thread in memory system
-            thread_id = manager.create_conversation()
+            # Reserve a thread id; its database row is written with the first message
+            thread_id = str(uuid.uuid4())
             
             # Initialize conversation data
-            conversations = st.session_state.get(conversations_key, {})
+            now = datetime.now().isoformat()
             conversations[conversation_name] = {
                 "thread_id": thread_id,
                 "title": conversation_name.title(),
                 "messages": [],
                 "welcome_shown": False,
-                "created_at": datetime.now().isoformat(),
-                "updated_at": datetime.now().isoformat()
+                "created_at": now,
+                "updated_at": now
             }
             
-            st.session_state[conversations_key] = conversations
-            
             self.logger.info(f"Created new conversation: {conversation_name}")
             return conversation_name
             
@@ -130,36 +150,21 @@ class ConversationManager:
     
     def get_conversation_names(self) -> List[str]:
         """Get list of conversation names for current user"""
-        try:
-            user_id = self._get_current_user_id()
-            conversations_key = self._get_user_conversations_key(user_id)
-            
-            conversations = st.session_state.get(conversations_key, {})
-            return list(conversations.keys())
-            
-        except Exception as e:
-            self.logger.error(f"Error getting conversation names: {e}")
-            return []
+        conversations_key = self._get_user_conversations_key()
+        
+        conversations = st.session_state.get(conversations_key, {})
+        return list(conversations.keys())
     
     def get_current_conversation(self) -> str:
         """Get current conversation name"""
-        try:
-            user_id = self._get_current_user_id()
-            current_conversation_key = f"current_conversation_{user_id or 'guest'}"
-            
-            return st.session_state.get(current_conversation_key, "conversation 1")
-            
-        except Exception as e:
-            self.logger.error(f"Error getting current conversation: {e}")
-            return "conversation 1"
+        current_conversation_key = self._get_current_conversation_key()
+        
+        return st.session_state.get(current_conversation_key, "conversation 1")
     
     def set_current_conversation(self, conversation_name: str):
         """Set current conversation"""
         try:
-            user_id = self._get_current_user_id()
-            current_conversation_key = f"current_conversation_{user_id or 'guest'}"
-            conversations_key = self._get_user_conversations_key(user_id)
-            manager_key = self._get_user_langgraph_manager_key(user_id)
+            conversations_key, manager_key, current_conversation_key, _ = self._resolve_keys()
             
             # Validate conversation exists
             conversations = st.session_state.get(conversations_key, {})
@@ -172,7 +177,7 @@ class ConversationManager:
             
             # Update memory manager thread
             manager = st.session_state.get(manager_key)
-            if manager and hasattr(manager, 'set_current_thread'):
+            if manager:
                 thread_id = conversations[conversation_name]["thread_id"]
                 manager.set_current_thread(thread_id)
             
@@ -181,59 +186,97 @@ class ConversationManager:
         except Exception as e:
             self.logger.error(f"Error setting current conversation: {e}")
     
-    def get_current_messages(self) -> List[Dict]:
-        """Get messages for current conversation"""
-        try:
-            current_conversation = self.get_current_conversation()
-            user_id = self._get_current_user_id()
-            conversations_key = self._get_user_conversations_key(user_id)
-            
-            conversations = st.session_state.get(conversations_key, {})
-            if current_conversation not in conversations:
-                return []
-            
-            return conversations[current_conversation].get("messages", [])
+    def get_current_messages(self, limit: Optional[int] = None) -> List[Dict]:
+        """
+        Get messages for current conversation
+        
+        Args:
+            limit: Maximum number of most recent messages to return (all if None)
             
-        except Exception as e:
-            self.logger.error(f"Error getting current messages: {e}")
+        Returns:
+            List of message dicts in chronological order
+        """
+        conversations_key, _, current_conversation_key, _ = self._resolve_keys()
+        current_conversation = st.session_state.get(current_conversation_key, "conversation 1")
+        
+        conversations = st.session_state.get(conversations_key, {})
+        if current_conversation not in conversations:
             return []
+        
+        messages = conversations[current_conversation].get("messages", [])
+        if limit is None or limit >= len(messages):
+            return messages
+        
+        return messages[len(messages) - limit:] if limit > 0 else []
+    
+    def get_message_window(self) -> int:
+        """Get how many recent messages of the current conversation are rendered"""
+        conversations_key, _, current_conversation_key, _ = self._resolve_keys()
+        current_conversation = st.session_state.get(current_conversation_key, "conversation 1")
+        
+        conversation_data = st.session_state.get(conversations_key, {}).get(current_conversation, {})
+        return conversation_data.get("messages_window", self.config.ui.max_rendered_messages)
+    
+    def expand_message_window(self):
+        """Render one more page of earlier messages for the current conversation"""
+        conversations_key, _, current_conversation_key, _ = self._resolve_keys()
+        current_conversation = st.session_state.get(current_conversation_key, "conversation 1")
+        
+        conversation_data = st.session_state.get(conversations_key, {}).get(current_conversation)
+        if conversation_data is None:
+            return
+        
+        # Stored with the conversation, so each conversation keeps its own window
+        # and reset_session_state clears it with the conversations
+        window = conversation_data.get("messages_window", self.config.ui.max_rendered_messages)
+        conversation_data["messages_window"] = window + self.config.ui.max_rendered_messages
+    
+    def get_current_message_count(self) -> int:
+        """Get number of messages in current conversation"""
+        conversations_key, _, current_conversation_key, _ = self._resolve_keys()
+        current_conversation = st.session_state.get(current_conversation_key, "conversation 1")
+        
+        conversations = st.session_state.get(conversations_key, {})
+        if current_conversation not in conversations:
+            return 0
+        
+        return len(conversations[current_conversation].get("messages", []))
     
     def add_message(self, role: str, content: str):
         """Add message to current conversation"""
         try:
-            current_conversation = self.get_current_conversation()
-            user_id = self._get_current_user_id()
-            conversations_key = self._get_user_conversations_key(user_id)
-            manager_key = self._get_user_langgraph_manager_key(user_id)
+            conversations_key, manager_key, current_conversation_key, _ = self._resolve_keys()
+            current_conversation = st.session_state.get(current_conversation_key, "conversation 1")
             
             # Get conversation data
-            conversations = st.session_state.get(conversations_key, {})
-            if current_conversation not in conversations:
+            conversation_data = st.session_state.get(conversations_key, {}).get(current_conversation)
+            if conversation_data is None:
                 self.logger.warning(f"Conversation not found: {current_conversation}")
                 return
             
-            conversation_data = conversations[current_conversation]
-            
             # Add to conversation messages
+            now = datetime.now().isoformat()
             message = {
                 "role": role,
                 "content": content,
-                "timestamp": datetime.now().isoformat()
+                "timestamp": now
             }
-            conversation_data["messages"].append(message)
-            conversation_data["updated_at"] = datetime.now().isoformat()
+            messages = conversation_data["messages"]
+            messages.append(message)
+            conversation_data["updated_at"] = now
+            
+            # Bound per-conversation retention in session state
+            excess = len(messages) - self.config.ui.max_session_messages
+            if excess > 0:
+                del messages[:excess]
             
             # Add to memory repository
             manager = st.session_state.get(manager_key)
-            if manager and hasattr(manager, 'add_message'):
+            if manager:
                 thread_id = conversation_data["thread_id"]
-                manager.add_message(thread_id, role, content)
-            
-            # Update session state
-            conversations[current_conversation] = conversation_data
-            st.session_state[conversations_key] = conversations
+                manager.add_message(thread_id, role, content, create_if_missing=True)
             
-            self.logger.debug(f"Added message to conversation {current_conversation}")
+            self.logger.debug("Added message to conversation %s", current_conversation)
             
         except Exception as e:
             self.logger.error(f"Error adding message: {e}")
@@ -241,22 +284,22 @@ class ConversationManager:
     def get_current_memory(self):
         """Get memory manager for current conversation"""
         try:
-            user_id = self._get_current_user_id()
-            manager_key = self._get_user_langgraph_manager_key(user_id)
+            conversations_key, manager_key, current_conversation_key, _ = self._resolve_keys()
             
             manager = st.session_state.get(manager_key)
             if not manager:
                 manager = self.memory_repository
                 st.session_state[manager_key] = manager
             
-            # Set current thread if needed
-            current_conversation = self.get_current_conversation()
-            conversations_key = self._get_user_conversations_key(user_id)
+            # Set current thread if needed. The repository is shared across sessions,
+            # so another session may have rebound it since set_current_conversation
+            current_conversation = st.session_state.get(current_conversation_key, "conversation 1")
             conversations = st.session_state.get(conversations_key, {})
             
-            if current_conversation in conversations and hasattr(manager, 'set_current_thread'):
+            if current_conversation in conversations:
                 thread_id = conversations[current_conversation]["thread_id"]
-                manager.set_current_thread(thread_id)
+                if manager.current_thread_id != thread_id:
+                    manager.set_current_thread(thread_id)
             
             return manager
             
@@ -266,49 +309,38 @@ class ConversationManager:
     
     def should_show_welcome_message(self) -> bool:
         """Check if welcome message should be shown for current conversation"""
-        try:
-            current_conversation = self.get_current_conversation()
-            user_id = self._get_current_user_id()
-            conversations_key = self._get_user_conversations_key(user_id)
-            
-            conversations = st.session_state.get(conversations_key, {})
-            if current_conversation not in conversations:
-                return True
-            
-            conversation_data = conversations[current_conversation]
-            messages = conversation_data.get("messages", [])
-            welcome_shown = conversation_data.get("welcome_shown", False)
-            
-            # Show welcome if no messages and not previously shown
-            return len(messages) == 0 and not welcome_shown
-            
-        except Exception as e:
-            self.logger.error(f"Error checking welcome message: {e}")
+        conversations_key, _, current_conversation_key, _ = self._resolve_keys()
+        current_conversation = st.session_state.get(current_conversation_key, "conversation 1")
+        
+        conversations = st.session_state.get(conversations_key, {})
+        if current_conversation not in conversations:
             return True
+        
+        conversation_data = conversations[current_conversation]
+        messages = conversation_data.get("messages", [])
+        welcome_shown = conversation_data.get("welcome_shown", False)
+        
+        # Show welcome if no messages and not previously shown
+        return len(messages) == 0 and not welcome_shown
     
     def mark_welcome_shown(self):
         """Mark welcome message as shown for current conversation"""
         try:
-            current_conversation = self.get_current_conversation()
-            user_id = self._get_current_user_id()
-            conversations_key = self._get_user_conversations_key(user_id)
+            conversations_key, _, current_conversation_key, _ = self._resolve_keys()
+            current_conversation = st.session_state.get(current_conversation_key, "conversation 1")
             
-            conversations = st.session_state.get(conversations_key, {})
-            if current_conversation in conversations:
-                conversations[current_conversation]["welcome_shown"] = True
-                st.session_state[conversations_key] = conversations
+            conversation_data = st.session_state.get(conversations_key, {}).get(current_conversation)
+            if conversation_data is not None:
+                conversation_data["welcome_shown"] = True
                 
-                self.logger.debug(f"Marked welcome as shown for {current_conversation}")
+                self.logger.debug("Marked welcome as shown for %s", current_conversation)
             
         except Exception as e:
             self.logger.error(f"Error marking welcome shown: {e}")
     
     def get_pending_prompt(self) -> Optional[str]:
         """Get pending prompt from session state and clear it"""
-        prompt = st.session_state.get("pending_prompt")
-        if prompt is not None:
-            self.clear_pending_prompt()
-        return prompt
+        return st.session_state.pop("pending_prompt", None)
     
     def set_pending_prompt(self, prompt: str):
         """Set pending prompt in session state"""
@@ -316,8 +348,7 @@ class ConversationManager:
     
     def clear_pending_prompt(self):
         """Clear pending prompt from session state"""
-        if "pending_prompt" in st.session_state:
-            del st.session_state["pending_prompt"]
+        st.session_state.pop("pending_prompt", None)
     
     def process_templated_prompt(self, prompt: str):
         """Process a templated prompt by setting it as pending"""
@@ -328,34 +359,31 @@ class ConversationManager:
     def delete_conversation(self, conversation_name: str) -> bool:
         """Delete a conversation"""
         try:
-            user_id = self._get_current_user_id()
-            conversations_key = self._get_user_conversations_key(user_id)
-            manager_key = self._get_user_langgraph_manager_key(user_id)
-            current_conversation_key = f"current_conversation_{user_id or 'guest'}"
+            conversations_key, manager_key, current_conversation_key, _ = self._resolve_keys()
             
             conversations = st.session_state.get(conversations_key, {})
             
-            if conversation_name not in conversations:
+            conversation_data = conversations.get(conversation_name)
+            if conversation_data is None:
                 self.logger.warning(f"Conversation not found for deletion: {conversation_name}")
                 return False
             
             # Get thread ID before deletion
-            thread_id = conversations[conversation_name]["thread_id"]
+            thread_id = conversation_data["thread_id"]
             
             # Delete from memory repository
             manager = st.session_state.get(manager_key)
-            if manager and hasattr(manager, 'delete_conversation'):
+            if manager:
                 manager.delete_conversation(thread_id)
             
             # Remove from conversations
             del conversations[conversation_name]
-            st.session_state[conversations_key] = conversations
             
             # If this was the current conversation, switch to another
             if st.session_state.get(current_conversation_key) == conversation_name:
-                remaining_conversations = list(conversations.keys())
-                if remaining_conversations:
-                    self.set_current_conversation(remaining_conversations[0])
+                next_conversation = next(iter(conversations), None)
+                if next_conversation is not None:
+                    self.set_current_conversation(next_conversation)
                 else:
                     # Create a new conversation if none remain
                     new_conv = self.create_new_conversation()
@@ -374,17 +402,9 @@ class ConversationManager:
     def reset_session_state(self):
         """Reset session state (clear all conversations)"""
         try:
-            user_id = self._get_current_user_id()
-            conversations_key = self._get_user_conversations_key(user_id)
-            manager_key = self._get_user_langgraph_manager_key(user_id)
-            current_conversation_key = f"current_conversation_{user_id or 'guest'}"
-            
-            # Clear session state keys
-            keys_to_clear = [conversations_key, manager_key, current_conversation_key, "pending_prompt"]
-            
-            for key in keys_to_clear:
-                if key in st.session_state:
-                    del st.session_state[key]
+            # Clear every per-user key plus the shared pending prompt
+            for key in (*self._resolve_keys(), "pending_prompt"):
+                st.session_state.pop(key, None)
             
             self.logger.info("Reset session state")
             
@@ -394,13 +414,17 @@ class ConversationManager:
 
 # Global conversation manager instance
 _conversation_manager: Optional[ConversationManager] = None
+_conversation_manager_lock = threading.Lock()
 
 
 def get_conversation_manager() -> ConversationManager:
     """Get the global conversation manager instance"""
     global _conversation_manager
     if _conversation_manager is None:
-        _conversation_manager = ConversationManager()
+        # Streamlit runs each session's script on its own thread
+        with _conversation_manager_lock:
+            if _conversation_manager is None:
+                _conversation_manager = ConversationManager()
     return _conversation_manager
 
 
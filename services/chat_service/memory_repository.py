@@ -3,22 +3,170 @@ Memory repository - handles conversation memory and persistence.
 Refactored from core/langgraph_memory.py into a service-oriented architecture.
 """
 
-from typing import Dict, Any, List, Optional
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
-from langgraph.checkpoint.memory import MemorySaver
-from langgraph.graph import StateGraph, MessagesState
-from langchain_openai import ChatOpenAI
 import tiktoken
 import sqlite3
-import json
 import os
+import threading
 import uuid
+import weakref
+import zlib
 from datetime import datetime
 
-from services.chat_service.models import Message, Conversation, ConversationSummary
-from infrastructure.config.settings import get_openai_api_key, get_config
+from services.chat_service.models import ConversationSummary
+from infrastructure.config.settings import get_config
 from infrastructure.monitoring.logging_service import get_logger
 
+# Schema version recorded in PRAGMA user_version once all migrations are applied
+SCHEMA_VERSION = 4
+
+# Seconds a connection waits on a locked database before raising
+BUSY_TIMEOUT_SECONDS = 5.0
+
+# Prepared statements each connection keeps compiled, above the sqlite3 default
+CACHED_STATEMENTS = 256
+
+# Bound parameters per statement, under SQLite's historical default limit of 999
+MAX_SQL_VARIABLES = 500
+
+# Characters of the latest user message kept as a conversation's preview
+PREVIEW_LENGTH = 100
+
+# Message content longer than this many characters is stored zlib-compressed as a BLOB
+COMPRESS_THRESHOLD = 1024
+
+# Worker threads tiktoken uses when encoding a batch of messages
+ENCODE_BATCH_THREADS = 4
+
+# Message class for each stored role; system and unknown roles fall back to AIMessage
+ROLE_MESSAGE_CLASSES = {
+    "user": HumanMessage,
+    "assistant": AIMessage,
+}
+
+# Tables and indexes created on startup, applied in a single transaction
+SCHEMA_SQL = '''
+CREATE TABLE IF NOT EXISTS conversations (
+    thread_id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    message_count INTEGER DEFAULT 0,
+    token_count INTEGER DEFAULT 0,
+    preview_text TEXT
+);
+
+CREATE TABLE IF NOT EXISTS messages (
+    id TEXT PRIMARY KEY,
+    thread_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    token_count INTEGER DEFAULT 0,
+    FOREIGN KEY (thread_id) REFERENCES conversations (thread_id)
+);
+
+-- Serves every per-thread ORDER BY timestamp query without a sort step
+CREATE INDEX IF NOT EXISTS idx_messages_thread_ts ON messages (thread_id, timestamp);
+-- Superseded by the composite index above
+DROP INDEX IF EXISTS idx_messages_thread_id;
+CREATE INDEX IF NOT EXISTS idx_messages_timestamp ON messages (timestamp);
+'''
+
+# Statements run on every request, kept as constants so the connection's statement cache reuses them
+INSERT_CONVERSATION_SQL = '''
+INSERT INTO conversations (thread_id, title, created_at, updated_at)
+VALUES (?, ?, ?, ?)
+'''
+
+# Rebuilds the derived conversation columns from the messages table (run on schema upgrade)
+RECOUNT_CONVERSATIONS_SQL = '''
+UPDATE conversations
+SET message_count = (
+        SELECT COUNT(*) FROM messages
+        WHERE messages.thread_id = conversations.thread_id
+    ),
+    token_count = (
+        SELECT COALESCE(SUM(token_count), 0) FROM messages
+        WHERE messages.thread_id = conversations.thread_id
+    ),
+    preview_text = (
+        SELECT CASE WHEN length(content) > ? THEN substr(content, 1, ?) || '...' ELSE content END
+        FROM messages
+        WHERE messages.thread_id = conversations.thread_id AND role = 'user'
+        ORDER BY timestamp DESC, rowid DESC
+        LIMIT 1
+    )
+'''
+
+# Creates the conversation row on first write unless it already exists
+ENSURE_CONVERSATION_SQL = '''
+INSERT OR IGNORE INTO conversations (thread_id, title, created_at, updated_at)
+VALUES (?, ?, ?, ?)
+'''
+
+LIST_CONVERSATIONS_SQL = '''
+SELECT thread_id, title, created_at, updated_at, message_count, preview_text
+FROM conversations
+ORDER BY updated_at DESC
+'''
+
+CLEAR_MESSAGES_SQL = 'DELETE FROM messages WHERE thread_id = ?'
+
+RESET_CONVERSATION_SQL = '''
+UPDATE conversations
+SET message_count = 0, token_count = 0, preview_text = NULL, updated_at = ?
+WHERE thread_id = ?
+'''
+
+INSERT_MESSAGE_SQL = '''
+INSERT INTO messages (id, thread_id, role, content, timestamp, token_count)
+VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+RECORD_MESSAGES_SQL = '''
+UPDATE conversations
+SET updated_at = ?,
+    message_count = message_count + ?,
+    token_count = token_count + ?,
+    preview_text = COALESCE(?, preview_text)
+WHERE thread_id = ?
+'''
+
+# rowid keeps insertion order for a batch that shares one timestamp
+SELECT_MESSAGES_SQL = '''
+SELECT role, content, token_count FROM messages
+WHERE thread_id = ?
+ORDER BY timestamp ASC, rowid ASC
+'''
+
+TRIM_MESSAGES_SQL = '''
+DELETE FROM messages
+WHERE id IN (
+    SELECT id FROM messages
+    WHERE thread_id = ?
+    ORDER BY timestamp ASC, rowid ASC
+    LIMIT ?
+)
+'''
+
+FORGET_MESSAGES_SQL = '''
+UPDATE conversations
+SET message_count = message_count - ?,
+    token_count = token_count - ?
+WHERE thread_id = ?
+'''
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(model_name: str) -> tiktoken.Encoding:
+    """Load the tokenizer for a model once per process"""
+    return tiktoken.encoding_for_model(model_name)
+
 
 class MemoryRepository:
     """
@@ -38,69 +186,97 @@ class MemoryRepository:
         self.logger = get_logger(__name__)
         self.max_token_limit = max_token_limit or config.memory.max_token_limit
         self.model_name = config.memory.model_name
+        self.max_cached_threads = config.memory.max_cached_threads
         self.db_path = db_path
         
         # Initialize tokenizer
-        self.encoding = tiktoken.encoding_for_model(self.model_name)
+        self.encoding = _get_encoding(self.model_name)
         
         # Initialize simple in-memory storage for messages
-        self._thread_messages = {}  # Simple dict storage: thread_id -> list of messages
+        # thread_id -> list of messages, least recently used first; evicted threads reload from the database
+        self._thread_messages: "OrderedDict[str, List[BaseMessage]]" = OrderedDict()
+        # Token count of each message, parallel to _thread_messages
+        self._thread_token_counts: Dict[str, List[int]] = {}
+        # The repository is shared by every session: cache reads, writes and evictions
+        # all hold this lock so a thread cannot be evicted in the middle of an update
+        self._cache_lock = threading.RLock()
         
         # Distinctive attribute to identify LangGraph memory manager
         self._is_langgraph_memory = True
         
+        # Shared long-lived connection, opened by _init_database
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        
         # Initialize database
         self._init_database()
         
         # Current thread ID for conversation
         self.current_thread_id = None
     
+    def _connect(self) -> sqlite3.Connection:
+        """Open a database connection with per-connection tuning applied"""
+        # Shared by Streamlit session threads; access is serialized by self._db_lock
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=BUSY_TIMEOUT_SECONDS,
+            check_same_thread=False,
+            cached_statements=CACHED_STATEMENTS,
+        )
+        # Transactions are opened explicitly by _cursor(write=True)
+        conn.isolation_level = None
+        # WAL (set once in _init_database) only needs fsync at checkpoints with NORMAL
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-20000")
+        return conn
+    
+    @contextmanager
+    def _cursor(self, write: bool = False) -> Iterator[sqlite3.Cursor]:
+        """
+        Yield a cursor on the shared connection
+        
+        Args:
+            write: Run inside a BEGIN IMMEDIATE transaction, committed on success and rolled back on error
+        """
+        with self._db_lock:
+            cursor = self._conn.cursor()
+            if not write:
+                yield cursor
+                return
+            
+            # Take the write lock up front so contention waits on busy_timeout
+            # instead of failing with SQLITE_BUSY when a deferred transaction upgrades
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                yield cursor
+            except BaseException:
+                self._conn.rollback()
+                raise
+            self._conn.commit()
+    
     def _init_database(self):
         """Initialize SQLite database for conversation metadata"""
         os.makedirs(os.path.dirname(self.db_path) if os.path.dirname(self.db_path) else ".", exist_ok=True)
         
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
+            # Close the shared connection when the repository is collected or at exit
+            weakref.finalize(self, conn.close)
             cursor = conn.cursor()
             
-            # Create conversations table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS conversations (
-                    thread_id TEXT PRIMARY KEY,
-                    title TEXT NOT NULL,
-                    created_at TEXT NOT NULL,
-                    updated_at TEXT NOT NULL,
-                    message_count INTEGER DEFAULT 0,
-                    token_count INTEGER DEFAULT 0
-                )
-            ''')
-            
-            # Create messages table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS messages (
-                    id TEXT PRIMARY KEY,
-                    thread_id TEXT NOT NULL,
-                    role TEXT NOT NULL,
-                    content TEXT NOT NULL,
-                    timestamp TEXT NOT NULL,
-                    token_count INTEGER DEFAULT 0,
-                    FOREIGN KEY (thread_id) REFERENCES conversations (thread_id)
-                )
-            ''')
+            # WAL lets readers proceed while a writer commits; the mode persists in the file
+            cursor.execute("PRAGMA journal_mode=WAL").fetchone()
+            
+            # Create tables and indexes in one transaction
+            cursor.executescript(f"BEGIN;\n{SCHEMA_SQL}\nCOMMIT;")
             
             # Run database migrations
+            cursor.execute("BEGIN IMMEDIATE")
             self._run_migrations(cursor)
             
-            # Create index for better performance
-            cursor.execute('''
-                CREATE INDEX IF NOT EXISTS idx_messages_thread_id ON messages (thread_id)
-            ''')
-            cursor.execute('''
-                CREATE INDEX IF NOT EXISTS idx_messages_timestamp ON messages (timestamp)
-            ''')
-            
             conn.commit()
-            conn.close()
+            self._conn = conn
             
             self.logger.info("Memory database initialized successfully")
             
@@ -111,6 +287,11 @@ class MemoryRepository:
     def _run_migrations(self, cursor):
         """Run database schema migrations"""
         try:
+            # Skip the column inspection once the schema is known to be current
+            cursor.execute("PRAGMA user_version")
+            if cursor.fetchone()[0] >= SCHEMA_VERSION:
+                return
+            
             # Check if conversations table exists and what columns it has
             cursor.execute("PRAGMA table_info(conversations)")
             columns = [column[1] for column in cursor.fetchall()]
@@ -128,15 +309,6 @@ class MemoryRepository:
             if 'message_count' not in columns and 'thread_id' in columns:
                 self.logger.info("Adding message_count column to conversations table")
                 cursor.execute("ALTER TABLE conversations ADD COLUMN message_count INTEGER DEFAULT 0")
-                # Update counts for existing conversations
-                cursor.execute('''
-                    UPDATE conversations 
-                    SET message_count = (
-                        SELECT COUNT(*) FROM messages 
-                        WHERE messages.thread_id = conversations.thread_id
-                    )
-                    WHERE message_count IS NULL
-                ''')
                 self.logger.info("Migration 2 completed: message_count column added")
             
             # Migration 3: Add token_count column if missing
@@ -144,6 +316,18 @@ class MemoryRepository:
                 self.logger.info("Adding token_count column to conversations table")
                 cursor.execute("ALTER TABLE conversations ADD COLUMN token_count INTEGER DEFAULT 0")
                 self.logger.info("Migration 3 completed: token_count column added")
+            
+            # Migration 4: Add preview_text column if missing
+            if 'preview_text' not in columns and 'thread_id' in columns:
+                self.logger.info("Adding preview_text column to conversations table")
+                cursor.execute("ALTER TABLE conversations ADD COLUMN preview_text TEXT")
+                self.logger.info("Migration 4 completed: preview_text column added")
+            
+            # Inserts and trims only adjust these columns, and older versions never decremented
+            # the counters on trim: recompute them once so the running totals start exact
+            cursor.execute(RECOUNT_CONVERSATIONS_SQL, (PREVIEW_LENGTH, PREVIEW_LENGTH))
+            
+            cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
                 
         except Exception as e:
             self.logger.error(f"Error during database migration: {e}")
@@ -161,25 +345,18 @@ class MemoryRepository:
         """
         try:
             thread_id = str(uuid.uuid4())
+            created_at = datetime.now()
             
             if not title:
-                title = f"Conversation {datetime.now().strftime('%Y-%m-%d %H:%M')}"
+                title = f"Conversation {created_at.strftime('%Y-%m-%d %H:%M')}"
             
             # Initialize empty message list for this thread
-            self._thread_messages[thread_id] = []
+            self._cache_thread(thread_id, [], [])
             
             # Store in database
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            now = datetime.now().isoformat()
-            cursor.execute('''
-                INSERT INTO conversations (thread_id, title, created_at, updated_at)
-                VALUES (?, ?, ?, ?)
-            ''', (thread_id, title, now, now))
-            
-            conn.commit()
-            conn.close()
+            now = created_at.isoformat()
+            with self._cursor(write=True) as cursor:
+                cursor.execute(INSERT_CONVERSATION_SQL, (thread_id, title, now, now))
             
             self.logger.info(f"Created new conversation: {thread_id}")
             return thread_id
@@ -188,7 +365,7 @@ class MemoryRepository:
             self.logger.error(f"Error creating conversation: {e}")
             raise
     
-    def add_message(self, thread_id: str, role: str, content: str) -> None:
+    def add_message(self, thread_id: str, role: str, content: str, create_if_missing: bool = False) -> None:
         """
         Add a message to the conversation
         
@@ -196,39 +373,62 @@ class MemoryRepository:
             thread_id: Thread identifier
             role: Message role (user, assistant, system)
             content: Message content
+            create_if_missing: Create the conversation row in the same transaction if it does not exist
+        """
+        self.add_messages(thread_id, [(role, content)], create_if_missing=create_if_missing)
+    
+    def add_messages(self, thread_id: str, messages: List[Tuple[str, str]], create_if_missing: bool = False) -> None:
         """
+        Add several messages to the conversation in a single transaction
+        
+        Args:
+            thread_id: Thread identifier
+            messages: (role, content) pairs in conversation order
+            create_if_missing: Create the conversation row in the same transaction if it does not exist
+        """
+        if not messages:
+            return
+        
         try:
-            # Create message
-            if role == "user":
-                message = HumanMessage(content=content)
-            elif role == "assistant":
-                message = AIMessage(content=content)
+            # Calculate token counts; a batch is only worth its thread pool for several messages
+            contents = [content for _, content in messages]
+            if len(contents) == 1:
+                token_counts = [len(self.encoding.encode(contents[0]))]
             else:
-                # For system messages, use AIMessage with system prefix
-                message = AIMessage(content=content)
-            
-            # Initialize thread if not exists
-            if thread_id not in self._thread_messages:
-                self._thread_messages[thread_id] = []
-            
-            # Add to in-memory storage
-            self._thread_messages[thread_id].append(message)
-            
-            # Calculate token count for this message
-            token_count = len(self.encoding.encode(content))
-            
-            # Store in database
-            self._save_message_to_db(thread_id, role, content, token_count)
-            
-            # Trim messages if over token limit
-            self._trim_messages_if_needed(thread_id)
+                token_counts = [
+                    len(tokens)
+                    for tokens in self.encoding.encode_batch(contents, num_threads=ENCODE_BATCH_THREADS)
+                ]
+            
+            with self._cache_lock:
+                # Load an evicted or not yet seen thread so new messages extend its history
+                self.get_messages(thread_id)
+                if thread_id not in self._thread_messages:
+                    self._cache_thread(thread_id, [], [])
+                
+                # Add to in-memory storage
+                self._thread_messages[thread_id].extend(
+                    self._create_message(role, content) for role, content in messages
+                )
+                self._thread_token_counts[thread_id].extend(token_counts)
+                
+                # Store in database
+                self._save_messages_to_db(thread_id, messages, token_counts, create_if_missing)
+                
+                # Trim messages if over token limit
+                self._trim_messages_if_needed(thread_id)
             
-            self.logger.debug(f"Added message to conversation {thread_id}")
+            self.logger.debug(f"Added {len(messages)} message(s) to conversation {thread_id}")
             
         except Exception as e:
             self.logger.error(f"Error adding message: {e}")
             raise
     
+    @staticmethod
+    def _create_message(role: str, content: str) -> BaseMessage:
+        """Build the LangChain message for a stored role"""
+        return ROLE_MESSAGE_CLASSES.get(role, AIMessage)(content=content)
+    
     def get_messages(self, thread_id: str) -> List[BaseMessage]:
         """
         Get all messages for a thread
@@ -239,11 +439,14 @@ class MemoryRepository:
         Returns:
             List of BaseMessage objects
         """
-        if thread_id not in self._thread_messages:
-            # Try to load from database
-            self._load_messages_from_db(thread_id)
-        
-        return self._thread_messages.get(thread_id, [])
+        with self._cache_lock:
+            if thread_id not in self._thread_messages:
+                # Try to load from database
+                self._load_messages_from_db(thread_id)
+            else:
+                self._thread_messages.move_to_end(thread_id)
+            
+            return self._thread_messages.get(thread_id, [])
     
     def get_chat_history(self, thread_id: str = None) -> List[BaseMessage]:
         """
@@ -279,13 +482,11 @@ class MemoryRepository:
         if thread_id is None:
             return 0
         
-        messages = self.get_messages(thread_id)
-        total_tokens = 0
-        
-        for message in messages:
-            total_tokens += len(self.encoding.encode(message.content))
-        
-        return total_tokens
+        with self._cache_lock:
+            # Loads the thread from the database if needed
+            self.get_messages(thread_id)
+            
+            return sum(self._thread_token_counts.get(thread_id, []))
     
     def clear_history(self, thread_id: str = None) -> None:
         """
@@ -301,23 +502,16 @@ class MemoryRepository:
             return
         
         try:
-            # Clear from memory
-            if thread_id in self._thread_messages:
-                del self._thread_messages[thread_id]
-            
-            # Clear from database
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('DELETE FROM messages WHERE thread_id = ?', (thread_id,))
-            cursor.execute('''
-                UPDATE conversations 
-                SET message_count = 0, token_count = 0, updated_at = ?
-                WHERE thread_id = ?
-            ''', (datetime.now().isoformat(), thread_id))
-            
-            conn.commit()
-            conn.close()
+            now = datetime.now().isoformat()
+            with self._cache_lock:
+                # Clear from memory
+                self._thread_messages.pop(thread_id, None)
+                self._thread_token_counts.pop(thread_id, None)
+                
+                # Clear from database
+                with self._cursor(write=True) as cursor:
+                    cursor.execute(CLEAR_MESSAGES_SQL, (thread_id,))
+                    cursor.execute(RESET_CONVERSATION_SQL, (now, thread_id))
             
             self.logger.info(f"Cleared history for conversation {thread_id}")
             
@@ -342,35 +536,22 @@ class MemoryRepository:
             List of conversation summaries
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT thread_id, title, created_at, updated_at, message_count, token_count
-                FROM conversations
-                ORDER BY updated_at DESC
-            ''')
-            
-            rows = cursor.fetchall()
-            conn.close()
-            
-            summaries = []
-            for row in rows:
-                thread_id, title, created_at, updated_at, message_count, token_count = row
-                
-                # Get preview text from latest message
-                preview_text = self._get_conversation_preview(thread_id)
+            from_iso = datetime.fromisoformat
+            with self._cursor() as cursor:
+                cursor.execute(LIST_CONVERSATIONS_SQL)
                 
-                summaries.append(ConversationSummary(
-                    conversation_id=thread_id,
-                    title=title,
-                    message_count=message_count or 0,
-                    last_activity=datetime.fromisoformat(updated_at),
-                    created_at=datetime.fromisoformat(created_at),
-                    preview_text=preview_text
-                ))
-            
-            return summaries
+                # Build summaries straight from the cursor instead of an intermediate row list
+                return [
+                    ConversationSummary(
+                        conversation_id=thread_id,
+                        title=title,
+                        message_count=message_count or 0,
+                        last_activity=from_iso(updated_at),
+                        created_at=from_iso(created_at),
+                        preview_text=preview_text
+                    )
+                    for thread_id, title, created_at, updated_at, message_count, preview_text in cursor
+                ]
             
         except Exception as e:
             self.logger.error(f"Error listing conversations: {e}")
@@ -386,53 +567,67 @@ class MemoryRepository:
         Returns:
             True if successful
         """
-        try:
-            # Clear from memory
-            if thread_id in self._thread_messages:
-                del self._thread_messages[thread_id]
-            
-            # Delete from database
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('DELETE FROM messages WHERE thread_id = ?', (thread_id,))
-            cursor.execute('DELETE FROM conversations WHERE thread_id = ?', (thread_id,))
-            
-            conn.commit()
-            conn.close()
+        return self.delete_conversations([thread_id])
+    
+    def delete_conversations(self, thread_ids: List[str]) -> bool:
+        """
+        Delete several conversations and all their messages in a single transaction
+        
+        Args:
+            thread_ids: Thread identifiers
             
-            self.logger.info(f"Deleted conversation {thread_id}")
+        Returns:
+            True if successful
+        """
+        try:
+            with self._cache_lock:
+                # Clear from memory
+                for thread_id in thread_ids:
+                    self._thread_messages.pop(thread_id, None)
+                    self._thread_token_counts.pop(thread_id, None)
+                
+                # Delete from database, one IN (...) statement per table and chunk
+                with self._cursor(write=True) as cursor:
+                    for start in range(0, len(thread_ids), MAX_SQL_VARIABLES):
+                        chunk = thread_ids[start:start + MAX_SQL_VARIABLES]
+                        placeholders = ", ".join("?" * len(chunk))
+                        cursor.execute(f'DELETE FROM messages WHERE thread_id IN ({placeholders})', chunk)
+                        cursor.execute(f'DELETE FROM conversations WHERE thread_id IN ({placeholders})', chunk)
+            
+            self.logger.info(f"Deleted {len(thread_ids)} conversation(s): {', '.join(thread_ids)}")
             return True
             
         except Exception as e:
             self.logger.error(f"Error deleting conversation: {e}")
             return False
     
-    def _save_message_to_db(self, thread_id: str, role: str, content: str, token_count: int):
-        """Save message to database"""
+    def _save_messages_to_db(self, thread_id: str, messages: List[Tuple[str, str]], token_counts: List[int],
+                             create_if_missing: bool = False):
+        """Save messages to database"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            message_id = str(uuid.uuid4())
-            now = datetime.now().isoformat()
-            
-            cursor.execute('''
-                INSERT INTO messages (id, thread_id, role, content, timestamp, token_count)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (message_id, thread_id, role, content, now, token_count))
-            
-            # Update conversation metadata
-            cursor.execute('''
-                UPDATE conversations 
-                SET updated_at = ?, 
-                    message_count = (SELECT COUNT(*) FROM messages WHERE thread_id = ?),
-                    token_count = (SELECT COALESCE(SUM(token_count), 0) FROM messages WHERE thread_id = ?)
-                WHERE thread_id = ?
-            ''', (now, thread_id, thread_id, thread_id))
-            
-            conn.commit()
-            conn.close()
+            created_at = datetime.now()
+            now = created_at.isoformat()
+            
+            # The latest user message in the batch becomes the conversation preview
+            latest_user_content = next(
+                (content for role, content in reversed(messages) if role == "user"), None
+            )
+            preview_text = self._make_preview(latest_user_content) if latest_user_content is not None else None
+            
+            with self._cursor(write=True) as cursor:
+                if create_if_missing:
+                    title = f"Conversation {created_at.strftime('%Y-%m-%d %H:%M')}"
+                    cursor.execute(ENSURE_CONVERSATION_SQL, (thread_id, title, now, now))
+                
+                cursor.executemany(INSERT_MESSAGE_SQL, [
+                    (str(uuid.uuid4()), thread_id, role, self._pack_content(content), now, token_count)
+                    for (role, content), token_count in zip(messages, token_counts)
+                ])
+                
+                # Update conversation metadata
+                cursor.execute(
+                    RECORD_MESSAGES_SQL, (now, len(messages), sum(token_counts), preview_text, thread_id)
+                )
             
         except Exception as e:
             self.logger.error(f"Error saving message to database: {e}")
@@ -440,94 +635,98 @@ class MemoryRepository:
     def _load_messages_from_db(self, thread_id: str):
         """Load messages from database into memory"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT role, content FROM messages 
-                WHERE thread_id = ? 
-                ORDER BY timestamp ASC
-            ''', (thread_id,))
-            
-            rows = cursor.fetchall()
-            conn.close()
-            
-            messages = []
-            for role, content in rows:
-                if role == "user":
-                    messages.append(HumanMessage(content=content))
-                elif role == "assistant":
-                    messages.append(AIMessage(content=content))
-                else:
-                    messages.append(AIMessage(content=content))
+            with self._cursor() as cursor:
+                cursor.execute(SELECT_MESSAGES_SQL, (thread_id,))
+                
+                rows = cursor.fetchall()
+            
+            # Build outside the lock; the class lookup replaces per-row role branching
+            message_class = ROLE_MESSAGE_CLASSES.get
+            unpack = self._unpack_content
+            messages = [
+                message_class(role, AIMessage)(content=unpack(content))
+                for role, content, _ in rows
+            ]
+            token_counts = [token_count for _, _, token_count in rows]
+            
+            # Counts are stored on insert; rows without one are encoded in a single batch
+            missing = [i for i, count in enumerate(token_counts) if count is None]
+            if missing:
+                encoded = self.encoding.encode_batch(
+                    [messages[i].content for i in missing], num_threads=ENCODE_BATCH_THREADS
+                )
+                for i, tokens in zip(missing, encoded):
+                    token_counts[i] = len(tokens)
             
-            self._thread_messages[thread_id] = messages
+            self._cache_thread(thread_id, messages, token_counts)
             
         except Exception as e:
             self.logger.error(f"Error loading messages from database: {e}")
     
+    def _cache_thread(self, thread_id: str, messages: List[BaseMessage], token_counts: List[int]):
+        """Keep a thread in memory, evicting the least recently used threads over the cap (caller holds _cache_lock)"""
+        self._thread_messages[thread_id] = messages
+        self._thread_messages.move_to_end(thread_id)
+        self._thread_token_counts[thread_id] = token_counts
+        
+        while len(self._thread_messages) > self.max_cached_threads:
+            evicted_thread_id, _ = self._thread_messages.popitem(last=False)
+            self._thread_token_counts.pop(evicted_thread_id, None)
+    
     def _trim_messages_if_needed(self, thread_id: str):
-        """Trim messages if over token limit"""
+        """Trim messages if over token limit (caller holds _cache_lock)"""
         try:
             messages = self._thread_messages.get(thread_id, [])
             if not messages:
                 return
+            token_counts = self._thread_token_counts[thread_id]
             
             # Calculate current token count
-            current_tokens = sum(len(self.encoding.encode(msg.content)) for msg in messages)
-            
-            # If over limit, remove oldest messages until under limit
-            while current_tokens > self.max_token_limit and len(messages) > 1:
-                removed_message = messages.pop(0)
-                current_tokens -= len(self.encoding.encode(removed_message.content))
+            current_tokens = sum(token_counts)
+            
+            # If over limit, count the oldest messages to drop, always keeping the latest one
+            drop_count = 0
+            while current_tokens > self.max_token_limit and drop_count < len(messages) - 1:
+                current_tokens -= token_counts[drop_count]
+                drop_count += 1
+            
+            if drop_count:
+                dropped_tokens = sum(token_counts[:drop_count])
+                del messages[:drop_count]
+                del token_counts[:drop_count]
                 
-                # Remove from database too
-                conn = sqlite3.connect(self.db_path)
-                cursor = conn.cursor()
-                cursor.execute('''
-                    DELETE FROM messages 
-                    WHERE thread_id = ? 
-                    AND id = (
-                        SELECT id FROM messages 
-                        WHERE thread_id = ? 
-                        ORDER BY timestamp ASC 
-                        LIMIT 1
-                    )
-                ''', (thread_id, thread_id))
-                conn.commit()
-                conn.close()
+                # Remove from database too, in one statement
+                with self._cursor(write=True) as cursor:
+                    cursor.execute(TRIM_MESSAGES_SQL, (thread_id, drop_count))
+                    cursor.execute(FORGET_MESSAGES_SQL, (drop_count, dropped_tokens, thread_id))
             
             self.logger.debug(f"Trimmed messages for {thread_id}, now {current_tokens} tokens")
             
         except Exception as e:
             self.logger.error(f"Error trimming messages: {e}")
     
-    def _get_conversation_preview(self, thread_id: str) -> Optional[str]:
-        """Get preview text for conversation"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT content FROM messages 
-                WHERE thread_id = ? AND role = 'user'
-                ORDER BY timestamp DESC 
-                LIMIT 1
-            ''', (thread_id,))
-            
-            row = cursor.fetchone()
-            conn.close()
-            
-            if row:
-                content = row[0]
-                # Truncate to reasonable preview length
-                return content[:100] + "..." if len(content) > 100 else content
-            
-            return None
-            
-        except Exception as e:
-            self.logger.error(f"Error getting conversation preview: {e}")
-            return None
+    @staticmethod
+    def _pack_content(content: str):
+        """Compress long message content; TEXT columns keep BLOB values as-is"""
+        if len(content) > COMPRESS_THRESHOLD:
+            raw = content.encode("utf-8")
+            packed = zlib.compress(raw)
+            # Keep incompressible content as text
+            if len(packed) < len(raw):
+                return packed
+        return content
+    
+    @staticmethod
+    def _unpack_content(content) -> str:
+        """Restore message content stored by _pack_content"""
+        if isinstance(content, bytes):
+            return zlib.decompress(content).decode("utf-8")
+        return content
+    
+    @staticmethod
+    def _make_preview(content: str) -> str:
+        """Truncate message content to preview length"""
+        return content[:PREVIEW_LENGTH] + "..." if len(content) > PREVIEW_LENGTH else content
 
 
 # Legacy compatibility functions
@@ -543,11 +742,15 @@ def create_langgraph_memory_manager():
 
 # Global memory repository instance
 _memory_repository: Optional[MemoryRepository] = None
+_memory_repository_lock = threading.Lock()
 
 
 def get_memory_repository() -> MemoryRepository:
     """Get the global memory repository instance"""
     global _memory_repository
     if _memory_repository is None:
-        _memory_repository = MemoryRepository()
+        # Concurrent first sessions must not initialize the database twice
+        with _memory_repository_lock:
+            if _memory_repository is None:
+                _memory_repository = MemoryRepository()
     return _memory_repository
\ No newline at end of file
@@ -22,13 +22,19 @@ class SimpleUserSession:
         self.logger = get_logger(__name__)
         # Don't initialize here - do it lazily when first accessed
     
-    def _ensure_user_session(self):
-        """Ensure user session exists in session state"""
-        if "user" not in st.session_state:
+    def _ensure_user_session(self) -> Dict:
+        """
+        Ensure user session exists in session state
+        
+        Returns:
+            The session's user dict
+        """
+        user = st.session_state.get("user")
+        if user is None:
             # Create a simple user with auto-generated ID
             user_id = str(uuid.uuid4())[:8]  # Short ID
             
-            st.session_state.user = {
+            user = {
                 "id": user_id,
                 "name": f"User {user_id}",  # Default display name
                 "created_at": datetime.now().isoformat(),
@@ -36,39 +42,35 @@ class SimpleUserSession:
                     "language": "fr"
                 }
             }
+            st.session_state.user = user
             
             self.logger.info(f"Created simple user session: {user_id}")
+        return user
     
     def get_user_id(self) -> str:
         """Get current user ID"""
-        self._ensure_user_session()
-        return st.session_state.user["id"]
+        return self._ensure_user_session()["id"]
     
     def get_user_name(self) -> str:
         """Get current user display name"""
-        self._ensure_user_session()
-        return st.session_state.user["name"]
+        return self._ensure_user_session()["name"]
     
     def set_user_name(self, name: str):
         """Set user display name"""
-        self._ensure_user_session()
-        st.session_state.user["name"] = name
+        self._ensure_user_session()["name"] = name
         self.logger.info(f"Updated user name to: {name}")
     
     def get_user_info(self) -> Dict:
         """Get complete user info"""
-        self._ensure_user_session()
-        return st.session_state.user.copy()
+        return self._ensure_user_session().copy()
     
     def get_preference(self, key: str, default=None):
         """Get user preference"""
-        self._ensure_user_session()
-        return st.session_state.user["preferences"].get(key, default)
+        return self._ensure_user_session()["preferences"].get(key, default)
     
     def set_preference(self, key: str, value):
         """Set user preference"""
-        self._ensure_user_session()
-        st.session_state.user["preferences"][key] = value
+        self._ensure_user_session()["preferences"][key] = value
         self.logger.debug(f"Set preference {key} = {value}")
     
     def render_user_info_sidebar(self):
@@ -79,8 +81,10 @@ class SimpleUserSession:
             # User info section
             st.markdown("**👤 User Info**")
             
+            user = self._ensure_user_session()
+            
             # Editable user name
-            current_name = self.get_user_name()
+            current_name = user["name"]
             new_name = st.text_input("Display Name", value=current_name, key="user_name_input")
             
             if new_name != current_name:
@@ -88,20 +92,19 @@ class SimpleUserSession:
                 st.rerun()
             
             # Show user ID (read-only)
-            st.text(f"ID: {self.get_user_id()}")
+            st.text(f"ID: {user['id']}")
     
     def get_user_context_for_conversations(self) -> Dict:
         """Get minimal user context for conversation system"""
-        self._ensure_user_session()
+        user = self._ensure_user_session()
         return {
-            "user_id": self.get_user_id(),
-            "user_name": self.get_user_name()
+            "user_id": user["id"],
+            "user_name": user["name"]
         }
     
     def clear_session(self):
         """Clear user session (creates new user)"""
-        if "user" in st.session_state:
-            del st.session_state.user
+        st.session_state.pop("user", None)
         self._ensure_user_session()
         self.logger.info("User session cleared and recreated")
 
@@ -3,6 +3,8 @@ Callback handlers - handles LLM callbacks for UI interactions and debugging.
 Migrated from core/callbacks.py into UI service for proper architectural separation.
 """
 
+import logging
+import sys
 import time
 from langchain.callbacks.base import BaseCallbackHandler
 from infrastructure.monitoring.logging_service import get_logger
@@ -11,25 +13,70 @@ from typing import List, Optional
 from langchain_core.documents import Document
 
 
+# Console dumps of RetrievalCallbackHandler are only useful when someone watches
+# the terminal; on a hosted deployment stdout is not a tty and they are skipped
+_DEBUG_TERMINAL = sys.stdout.isatty()
+
+# Input keys searched, in order, for the user prompt in on_chain_start
+_PROMPT_KEYS = ("question", "input", "query", "text", "prompt")
+
+
+def _extract_text(value) -> str:
+    """
+    Extract prompt text from a chain input value.
+    
+    Args:
+        value: A string, or a list of chat messages (objects or dicts)
+        
+    Returns:
+        The string itself, the content of the last message, or "" otherwise
+    """
+    if isinstance(value, str):
+        return value
+    if isinstance(value, list) and value:
+        # Prendre le dernier message de l'utilisateur
+        last_message = value[-1]
+        if hasattr(last_message, 'content'):
+            return last_message.content
+        if isinstance(last_message, dict):
+            return last_message.get('content', "")
+    return ""
+
+
 class StreamlitCallbackHandler(BaseCallbackHandler):
     """Handler pour afficher le texte en streaming dans Streamlit"""
     
-    def __init__(self, placeholder, update_every=1, delay=0.01):
+    # Repaint once this many tokens are waiting, even inside the paint interval
+    MAX_PENDING_TOKENS = 8
+    
+    def __init__(self, placeholder, update_every=1, min_paint_interval=1 / 60, ttft_placeholder=None):
         self.placeholder = placeholder
-        self.text = ""
+        # Optional separate slot for the time-to-first-token caption
+        self.ttft_placeholder = ttft_placeholder
+        # Every token received so far, joined on demand by the text property
+        self._chunks: List[str] = []
+        # Number of tokens already shown by the last repaint
+        self._painted_count = 0
         self.counter = 0
         self.update_every = update_every
-        self.delay = delay
+        # Minimum seconds between repaints; tokens arriving sooner are shown with the next one
+        self.min_paint_interval = min_paint_interval
         
         # Timing metrics
         self.llm_start_time = None
         self.first_token_time = None
         self.last_update_time = None
+        self.last_paint_time = None
         self.total_tokens = 0
         
         # Logger for performance metrics
         self.logger = get_logger("streaming_metrics")
     
+    @property
+    def text(self) -> str:
+        """Response text streamed so far"""
+        return "".join(self._chunks)
+    
     def on_llm_start(self, serialized, prompts, **kwargs):
         """Record when LLM processing starts"""
         self.llm_start_time = time.time()
@@ -44,25 +91,31 @@ class StreamlitCallbackHandler(BaseCallbackHandler):
             if self.llm_start_time:
                 ttft = (self.first_token_time - self.llm_start_time) * 1000  # Convert to ms
                 self.logger.info(f"[TTFT] Time to First Token (TTFT): {ttft:.1f}ms")
-                # Show TTFT in the UI temporarily
-                self.placeholder.markdown(f"_First token in {ttft:.1f}ms..._")
-                time.sleep(0.3)  # Brief display of TTFT
+                # Shown beside the answer so streaming starts without a pause
+                if self.ttft_placeholder is not None:
+                    self.ttft_placeholder.caption(f"First token: {ttft:.0f}ms")
         
-        self.text += token
+        self._chunks.append(token)
         self.counter += 1
         self.total_tokens += 1
         
-        # Update display
-        if self.counter % self.update_every == 0:
+        # Update display once per paint interval, or sooner if enough tokens are waiting
+        pending_count = len(self._chunks) - self._painted_count
+        if pending_count >= self.update_every and (
+            self.last_paint_time is None
+            or pending_count >= self.MAX_PENDING_TOKENS
+            or current_time - self.last_paint_time >= self.min_paint_interval
+        ):
             self.placeholder.markdown(self.text + "▌")
-            
-            # Log streaming performance every 10 tokens
-            if self.counter % 10 == 0 and self.first_token_time:
-                elapsed = (current_time - self.first_token_time) * 1000
-                tokens_per_sec = self.counter / ((current_time - self.first_token_time) + 0.001)
-                self.logger.debug(f"[STREAMING] {self.counter} tokens in {elapsed:.1f}ms ({tokens_per_sec:.1f} tok/s)")
-            
-            time.sleep(self.delay)
+            self._painted_count = len(self._chunks)
+            self.last_paint_time = current_time
+        
+        # Log streaming performance every 10 tokens, skipping the formatting when debug is off
+        if self.counter % 10 == 0 and self.first_token_time and self.logger.isEnabledFor(logging.DEBUG):
+            elapsed_s = current_time - self.first_token_time
+            elapsed = elapsed_s * 1000
+            tokens_per_sec = self.counter / (elapsed_s + 0.001)
+            self.logger.debug(f"[STREAMING] {self.counter} tokens in {elapsed:.1f}ms ({tokens_per_sec:.1f} tok/s)")
         
         self.last_update_time = current_time
     
@@ -102,8 +155,13 @@ class RetrievalCallbackHandler(BaseCallbackHandler):
         # Stocker la question dans le collector pour l'affichage UI
         self.chunks_collector.set_question(query)
         
-        print(f"\nRecherche de chunks pour la question: '{query}'")
-        print("=" * 80)
+        if not _DEBUG_TERMINAL:
+            return
+        
+        # Collected and printed at once: one write instead of one per line
+        lines = []
+        lines.append(f"\nRecherche de chunks pour la question: '{query}'")
+        lines.append("=" * 80)
         
         # Afficher la mémoire de conversation si disponible
         if self.memory and hasattr(self.memory, 'memory') and hasattr(self.memory.memory, 'chat_memory'):
@@ -111,118 +169,109 @@ class RetrievalCallbackHandler(BaseCallbackHandler):
             messages = chat_memory.messages
             
             if messages:
-                print(f"\nMemoire de conversation ({len(messages)} messages):")
-                print("=" * 80)
+                lines.append(f"\nMemoire de conversation ({len(messages)} messages):")
+                lines.append("=" * 80)
                 for i, msg in enumerate(messages, 1):
                     role = "Utilisateur" if msg.type == "human" else "Assistant"
-                    print(f"\n{i}. {role}:")
-                    print("-" * 40)
-                    print(msg.content)
-                    print("-" * 40)
-                    print(f"Longueur: {len(msg.content)} caracteres")
-                print("=" * 80)
+                    lines.append(f"\n{i}. {role}:")
+                    lines.append("-" * 40)
+                    lines.append(msg.content)
+                    lines.append("-" * 40)
+                    lines.append(f"Longueur: {len(msg.content)} caracteres")
+                lines.append("=" * 80)
             else:
-                print("\nMemoire de conversation: (vide)")
+                lines.append("\nMemoire de conversation: (vide)")
         else:
-            print("\nMemoire de conversation: (non disponible)")
+            lines.append("\nMemoire de conversation: (non disponible)")
+        
+        print("\n".join(lines))
     
     def on_retriever_end(self, documents, **kwargs):
-        # Stocker les documents pour l'affichage UI
-        self.retrieved_documents = documents.copy()
+        # Stocker les documents pour l'affichage UI (lecture seule, pas de copie)
+        self.retrieved_documents = documents
         self.chunks_collector.add_chunks(documents)
         
-        print(f"{len(documents)} chunks recuperes:")
-        print("-" * 80)
+        if not _DEBUG_TERMINAL:
+            return
+        
+        lines = []
+        lines.append(f"{len(documents)} chunks recuperes:")
+        lines.append("-" * 80)
         for i, doc in enumerate(documents, 1):
-            print(f"\nChunk {i}:")
-            print(f"   Source: {getattr(doc.metadata, 'source', 'N/A')}")
-            print(f"   Page: {getattr(doc.metadata, 'page', 'N/A')}")
-            print(f"   Contenu: {doc.page_content[:200]}...")
-            if len(doc.page_content) > 200:
-                print(f"   (tronque, longueur totale: {len(doc.page_content)} caracteres)")
-            print("-" * 40)
-        print("=" * 80)
+            metadata = doc.metadata
+            page_content = doc.page_content
+            lines.append(f"\nChunk {i}:")
+            lines.append(f"   Source: {metadata.get('source', 'N/A')}")
+            lines.append(f"   Page: {metadata.get('page', 'N/A')}")
+            lines.append(f"   Contenu: {page_content[:200]}...")
+            if len(page_content) > 200:
+                lines.append(f"   (tronque, longueur totale: {len(page_content)} caracteres)")
+            lines.append("-" * 40)
+        lines.append("=" * 80)
+        
+        print("\n".join(lines))
     
     def on_chain_start(self, serialized, inputs, **kwargs):
         """Affiche le prompt utilisé par le système"""
-        print(f"\nPrompt utilise par le systeme:")
-        print("=" * 80)
+        if not _DEBUG_TERMINAL:
+            return
+        
+        lines = []
+        lines.append(f"\nPrompt utilise par le systeme:")
+        lines.append("=" * 80)
         
         # Chercher le prompt dans les inputs
         prompt_text = ""
         
         # Handle both dictionary inputs and RAGState objects
         try:
-            # If inputs is a RAGState object, extract the question
             if hasattr(inputs, 'question'):
                 prompt_text = inputs.question
-            # If inputs is a dictionary
             elif isinstance(inputs, dict):
-                # Essayer différentes façons de récupérer le prompt
-                if "question" in inputs:
-                    question = inputs["question"]
-                    # Si c'est une chaîne simple
-                    if isinstance(question, str):
-                        prompt_text = question
-                    # Si c'est une liste de messages (format chat)
-                    elif isinstance(question, list) and len(question) > 0:
-                        # Prendre le dernier message de l'utilisateur
-                        last_message = question[-1]
-                        if hasattr(last_message, 'content'):
-                            prompt_text = last_message.content
-                        elif isinstance(last_message, dict) and 'content' in last_message:
-                            prompt_text = last_message['content']
-                
-                # Si on n'a pas trouvé dans "question", chercher dans d'autres clés possibles
-                if not prompt_text:
-                    for key in ["input", "query", "text", "prompt"]:
-                        if key in inputs:
-                            value = inputs[key]
-                            if isinstance(value, str):
-                                prompt_text = value
-                                break
-                            elif isinstance(value, list) and len(value) > 0:
-                                last_item = value[-1]
-                                if hasattr(last_item, 'content'):
-                                    prompt_text = last_item.content
-                                    break
-                                elif isinstance(last_item, dict) and 'content' in last_item:
-                                    prompt_text = last_item['content']
-                                    break
+                for key in _PROMPT_KEYS:
+                    prompt_text = _extract_text(inputs.get(key))
+                    if prompt_text:
+                        break
         except Exception as e:
-            print(f"Error processing inputs: {e}")
+            lines.append(f"Error processing inputs: {e}")
             prompt_text = ""
         
         # Vérifier si la question a été reformulée
         if self.original_question and prompt_text and prompt_text != self.original_question:
-            print(f"ATTENTION: Question reformulee!")
-            print(f"   Question originale: '{self.original_question}'")
-            print(f"   Question reformulee: '{prompt_text}'")
-            print("-" * 40)
+            lines.append(f"ATTENTION: Question reformulee!")
+            lines.append(f"   Question originale: '{self.original_question}'")
+            lines.append(f"   Question reformulee: '{prompt_text}'")
+            lines.append("-" * 40)
         
         # Afficher les 500 premiers caractères
         if prompt_text:
             truncated_prompt = prompt_text[:500]
-            print(f"Question utilisateur (500 premiers caracteres):")
-            print("-" * 40)
-            print(truncated_prompt)
+            lines.append(f"Question utilisateur (500 premiers caracteres):")
+            lines.append("-" * 40)
+            lines.append(truncated_prompt)
             if len(prompt_text) > 500:
-                print(f"... (tronque, longueur totale: {len(prompt_text)} caracteres)")
-            print("-" * 40)
+                lines.append(f"... (tronque, longueur totale: {len(prompt_text)} caracteres)")
+            lines.append("-" * 40)
         else:
-            print("Impossible de recuperer le prompt")
+            lines.append("Impossible de recuperer le prompt")
             try:
                 available_keys = list(inputs.keys()) if hasattr(inputs, 'keys') else str(type(inputs))
-                print("Type/cles disponibles dans inputs:", available_keys)
+                lines.append(f"Type/cles disponibles dans inputs: {available_keys}")
             except:
-                print("Type d'inputs:", type(inputs))
+                lines.append(f"Type d'inputs: {type(inputs)}")
+        
+        lines.append("=" * 80)
         
-        print("=" * 80)
+        print("\n".join(lines))
     
     def on_llm_start(self, serialized, prompts, **kwargs):
         """Affiche le prompt système complet utilisé par le LLM"""
-        print(f"\nPrompt systeme complet utilise par le LLM:")
-        print("=" * 80)
+        if not _DEBUG_TERMINAL:
+            return
+        
+        lines = []
+        lines.append(f"\nPrompt systeme complet utilise par le LLM:")
+        lines.append("=" * 80)
         
         if prompts and len(prompts) > 0:
             # Le premier prompt contient généralement le prompt système complet
@@ -230,34 +279,36 @@ class RetrievalCallbackHandler(BaseCallbackHandler):
             
             # Afficher les 1000 premiers caractères du prompt système
             truncated_system = system_prompt[:1000]
-            print(f"Prompt systeme (1000 premiers caracteres):")
-            print("-" * 40)
-            print(truncated_system)
+            lines.append(f"Prompt systeme (1000 premiers caracteres):")
+            lines.append("-" * 40)
+            lines.append(truncated_system)
             if len(system_prompt) > 1000:
-                print(f"... (tronque, longueur totale: {len(system_prompt)} caracteres)")
-            print("-" * 40)
+                lines.append(f"... (tronque, longueur totale: {len(system_prompt)} caracteres)")
+            lines.append("-" * 40)
             
             # Si il y a plusieurs prompts, afficher le nombre
             if len(prompts) > 1:
-                print(f"Nombre total de prompts: {len(prompts)}")
+                lines.append(f"Nombre total de prompts: {len(prompts)}")
         else:
-            print("Aucun prompt systeme trouve")
+            lines.append("Aucun prompt systeme trouve")
+        
+        lines.append("=" * 80)
         
-        print("=" * 80)
+        print("\n".join(lines))
     
     def get_chunks_collector(self) -> ChunksCollector:
         """Get the chunks collector for UI display"""
         return self.chunks_collector
     
     def get_retrieved_documents(self) -> List[Document]:
-        """Get the last retrieved documents"""
-        return self.retrieved_documents.copy()
+        """Get a copy of the last retrieved documents"""
+        return list(self.retrieved_documents)
 
 
 # Service convenience functions
-def get_streamlit_callback_handler(placeholder, update_every=1, delay=0.01):
+def get_streamlit_callback_handler(placeholder, update_every=1, min_paint_interval=1 / 60, ttft_placeholder=None):
     """Get a Streamlit callback handler instance"""
-    return StreamlitCallbackHandler(placeholder, update_every, delay)
+    return StreamlitCallbackHandler(placeholder, update_every, min_paint_interval, ttft_placeholder)
 
 
 def get_retrieval_callback_handler(memory=None, chunks_collector=None):
@@ -5,8 +5,7 @@ Refactored from utils/streamlit_helpers.py into a service-oriented architecture.
 
 import streamlit as st
 import time
-from typing import List, Dict, Optional
-from langfuse.langchain import CallbackHandler
+from typing import List, Dict, Optional, TYPE_CHECKING
 
 from infrastructure.config.settings import get_config
 from infrastructure.external.langfuse_client import get_langfuse_client
@@ -14,6 +13,33 @@ from services.ui_service.callback_handlers import StreamlitCallbackHandler
 from services.chat_service.conversation_manager import get_conversation_manager
 from infrastructure.monitoring.logging_service import get_logger
 
+if TYPE_CHECKING:
+    from langfuse.langchain import CallbackHandler
+
+# Legacy collection display names mapped to their current keys
+_LEGACY_COLLECTION_MAPPING = {
+    "Sub-chapters (Semantic)": "subchapters",
+    "Original (Character-based)": "original"
+}
+
+
+def _format_collection_name(key: str) -> str:
+    """
+    Build the user-friendly display name of a collection.
+    
+    Args:
+        key: Collection key from the vectorstore config
+        
+    Returns:
+        Display name shown in the collection selector
+    """
+    if key == "subchapters":
+        return "📚 Sub-chapters (Semantic)"
+    elif key == "original":
+        return "📄 Original (Character-based)"
+    else:
+        return f"📚 {key.title()}"
+
 
 class ChatInterface:
     """
@@ -26,50 +52,63 @@ class ChatInterface:
         self.config = get_config()
         self.conversation_manager = get_conversation_manager()
         self.langfuse_client = get_langfuse_client()
+        # Collections only change with the config, so build the selector data once
+        self.collection_options = list(self.config.vectorstore.collections.keys())
+        self.collection_labels = {key: _format_collection_name(key) for key in self.collection_options}
     
-    def get_langfuse_handler(self) -> Optional[CallbackHandler]:
+    def get_langfuse_handler(self) -> Optional["CallbackHandler"]:
         """Get Langfuse callback handler if available"""
         return self.langfuse_client.get_callback_handler()
     
-    def create_stream_handler(self, placeholder):
+    def create_stream_handler(self, placeholder, ttft_placeholder=None):
         """Create a streaming callback handler for Streamlit"""
         return StreamlitCallbackHandler(
             placeholder, 
             update_every=self.config.streaming.update_every, 
-            delay=self.config.streaming.delay
+            min_paint_interval=self.config.streaming.min_paint_interval,
+            ttft_placeholder=ttft_placeholder
         )
     
     def render_conversation_sidebar(self):
         """Render the conversation sidebar"""
         config = self.config
         
+        # Snapshot everything the sidebar shows once per render
         conversation_names = self.conversation_manager.get_conversation_names()
         current_conversation = self.conversation_manager.get_current_conversation()
         
-        # Get conversations data for title display
-        conversations_key = self.conversation_manager._get_user_conversations_key()
+        # The repository is shared across sessions: read both stats for the same thread
+        current_memory = self.conversation_manager.get_current_memory()
+        thread_id = current_memory.current_thread_id
+        message_count = len(current_memory.get_chat_history(thread_id))
+        token_count = current_memory.get_token_count(thread_id)
+        max_tokens = config.memory.max_token_limit
         
         with st.sidebar:
             # Enhanced sidebar header
             st.markdown("## 💬 Conversations")
             
             # Simple conversation list - no search or filters
-            st.caption(f"📊 {len(conversation_names)} conversation{'s' if len(conversation_names) != 1 else ''}")
+            conversation_count = len(conversation_names)
+            st.caption(f"📊 {conversation_count} conversation{'s' if conversation_count != 1 else ''}")
             display_conversations = conversation_names
             
             # Conversation list
             st.markdown("### Select Conversation")
             
-            # Current conversation indicator
-            for conv_name in display_conversations:
-                if conv_name == current_conversation:
-                    if st.button(f"✅ {conv_name}", key=f"current_{conv_name}", use_container_width=True, 
-                               help="Currently active conversation", type="primary"):
-                        pass  # Already current, no action needed
-                else:
-                    if st.button(f"💬 {conv_name}", key=f"select_{conv_name}", use_container_width=True):
-                        self.conversation_manager.set_current_conversation(conv_name)
-                        st.rerun()
+            # One radio for all conversations, with the current one marked
+            if display_conversations:
+                selected_conversation = st.radio(
+                    "Conversations",
+                    display_conversations,
+                    index=display_conversations.index(current_conversation)
+                    if current_conversation in display_conversations else None,
+                    format_func=lambda name: f"✅ {name}" if name == current_conversation else f"💬 {name}",
+                    label_visibility="collapsed"
+                )
+                if selected_conversation is not None and selected_conversation != current_conversation:
+                    self.conversation_manager.set_current_conversation(selected_conversation)
+                    st.rerun()
             
             # New conversation button
             st.divider()
@@ -82,43 +121,18 @@ class ChatInterface:
             st.markdown("### 🗂️ Collection")
             
             # Get current collection from session state or use default
-            if "selected_collection" not in st.session_state:
-                st.session_state.selected_collection = config.vectorstore.default_collection_key
+            self._migrate_selected_collection()
             
             # Collection selector
-            collection_options = list(config.vectorstore.collections.keys())
-            
-            # Handle legacy collection names (migration from old format)
-            legacy_mapping = {
-                "Sub-chapters (Semantic)": "subchapters",
-                "Original (Character-based)": "original"
-            }
-            
-            # Check if current selection is a legacy format and migrate it
-            if st.session_state.selected_collection in legacy_mapping:
-                st.session_state.selected_collection = legacy_mapping[st.session_state.selected_collection]
-            
-            # Ensure the selected collection exists in current options
-            if st.session_state.selected_collection not in collection_options:
-                st.session_state.selected_collection = config.vectorstore.default_collection_key
+            collection_options = self.collection_options
             
             current_index = collection_options.index(st.session_state.selected_collection)
             
-            # Create user-friendly display names
-            def format_collection_name(key):
-                collection = config.vectorstore.collections[key]
-                if key == "subchapters":
-                    return "📚 Sub-chapters (Semantic)"
-                elif key == "original":
-                    return "📄 Original (Character-based)"
-                else:
-                    return f"📚 {key.title()}"
-            
             selected_collection = st.selectbox(
                 "Select knowledge base:",
                 collection_options,
                 index=current_index,
-                format_func=format_collection_name,
+                format_func=self.collection_labels.get,
                 help="Choose which collection of documents to search"
             )
             
@@ -140,23 +154,19 @@ class ChatInterface:
             # Memory information section
             st.markdown("### 🧠 Memory Status")
             
-            current_memory = self.conversation_manager.get_current_memory()
-            chat_history = current_memory.get_chat_history()
-            token_count = current_memory.get_token_count()
-            max_tokens = config.memory.max_token_limit
-            
             # Display memory statistics
-            st.write(f"**Messages:** {len(chat_history)}")
+            st.write(f"**Messages:** {message_count}")
             st.write(f"**Tokens:** {token_count}/{max_tokens}")
             
             # Memory usage progress bar
-            memory_percentage = min(token_count / max_tokens * 100, 100)
+            percentage = token_count / max_tokens * 100
+            memory_percentage = percentage if percentage < 100 else 100
             st.progress(memory_percentage / 100)
             
-            if memory_percentage > 80:
-                st.warning("⚠️ Memory usage high - older messages may be trimmed")
-            elif memory_percentage > 95:
+            if memory_percentage > 95:
                 st.error("🚨 Memory nearly full - performance may be affected")
+            elif memory_percentage > 80:
+                st.warning("⚠️ Memory usage high - older messages may be trimmed")
             
             # Removed Actions section - no clear or rename functionality
             
@@ -220,27 +230,34 @@ class ChatInterface:
     
     def get_selected_collection(self) -> str:
         """Get the currently selected collection from session state"""
-        config = self.config
+        self._migrate_selected_collection()
+        return st.session_state.selected_collection
+    
+    def _migrate_selected_collection(self):
+        """
+        Validate the session's selected collection.
+        Sets the default when missing, maps legacy names to current keys and
+        falls back to the default for unknown collections. Once a session has
+        been migrated, a valid selection only costs a membership check.
+        """
+        if (st.session_state.get("collection_migrated")
+                and st.session_state.selected_collection in self.collection_options):
+            return
         
+        default_collection = self.config.vectorstore.default_collection_key
         if "selected_collection" not in st.session_state:
-            st.session_state.selected_collection = config.vectorstore.default_collection_key
+            st.session_state.selected_collection = default_collection
         
         # Handle legacy collection names (migration from old format)
-        legacy_mapping = {
-            "Sub-chapters (Semantic)": "subchapters",
-            "Original (Character-based)": "original"
-        }
-        
-        # Check if current selection is a legacy format and migrate it
-        if st.session_state.selected_collection in legacy_mapping:
-            st.session_state.selected_collection = legacy_mapping[st.session_state.selected_collection]
+        selected_collection = st.session_state.selected_collection
+        selected_collection = _LEGACY_COLLECTION_MAPPING.get(selected_collection, selected_collection)
         
         # Ensure the selected collection exists in current options
-        collection_options = list(config.vectorstore.collections.keys())
-        if st.session_state.selected_collection not in collection_options:
-            st.session_state.selected_collection = config.vectorstore.default_collection_key
+        if selected_collection not in self.collection_options:
+            selected_collection = default_collection
         
-        return st.session_state.selected_collection
+        st.session_state.selected_collection = selected_collection
+        st.session_state.collection_migrated = True
     
     # Removed _filter_conversations method - no search functionality needed
     
@@ -287,10 +304,10 @@ def get_langfuse_handler():
     return interface.get_langfuse_handler()
 
 
-def create_stream_handler(placeholder):
+def create_stream_handler(placeholder, ttft_placeholder=None):
     """Create stream handler (legacy compatibility)"""
     interface = get_chat_interface()
-    return interface.create_stream_handler(placeholder)
+    return interface.create_stream_handler(placeholder, ttft_placeholder)
 
 
 def render_conversation_sidebar():
@@ -8,6 +8,8 @@ from langchain_core.documents import Document
 from services.ui_service.callback_handlers import RetrievalCallbackHandler, StreamlitCallbackHandler
 from services.ui_service.chunks_renderer import ChunksCollector
 
+DEBUG_TERMINAL = 'services.ui_service.callback_handlers._DEBUG_TERMINAL'
+
 
 class TestRetrievalCallbackHandler:
     """Test RetrievalCallbackHandler functionality"""
@@ -33,7 +35,7 @@ class TestRetrievalCallbackHandler:
         handler = RetrievalCallbackHandler()
         query = "What is emotivity?"
         
-        with patch('builtins.print') as mock_print:
+        with patch('builtins.print') as mock_print, patch(DEBUG_TERMINAL, True):
             handler.on_retriever_start({}, query)
             
         assert handler.original_question == query
@@ -55,12 +57,43 @@ class TestRetrievalCallbackHandler:
             )
         ]
         
-        with patch('builtins.print') as mock_print:
+        with patch('builtins.print') as mock_print, patch(DEBUG_TERMINAL, True):
             handler.on_retriever_end(documents)
             
         assert len(handler.retrieved_documents) == 2
         assert len(handler.chunks_collector.chunks) == 2
         mock_print.assert_called()
+        output = "".join(str(arg) for call in mock_print.call_args_list for arg in call.args)
+        assert "Source: test1.pdf" in output
+        assert "Page: 2" in output
+        
+    def test_no_console_output_without_terminal(self):
+        """Test that the debug dumps are skipped when stdout is not a terminal"""
+        handler = RetrievalCallbackHandler()
+        documents = [Document(page_content="Test content", metadata={"source": "test.pdf"})]
+        
+        with patch('builtins.print') as mock_print, patch(DEBUG_TERMINAL, False):
+            handler.on_retriever_start({}, "What is emotivity?")
+            handler.on_retriever_end(documents)
+            handler.on_chain_start({}, {"question": "What is emotivity?"})
+            handler.on_llm_start({}, ["System prompt"])
+            
+        mock_print.assert_not_called()
+        # UI state is still collected
+        assert handler.chunks_collector.question == "What is emotivity?"
+        assert len(handler.chunks_collector.chunks) == 1
+        
+    def test_on_chain_start_reads_last_chat_message(self):
+        """Test prompt lookup falls back to the last message of a chat input"""
+        handler = RetrievalCallbackHandler()
+        inputs = {"question": "", "input": [{"content": "old"}, {"content": "Qu'est-ce qu'un colérique ?"}]}
+        
+        with patch('builtins.print') as mock_print, patch(DEBUG_TERMINAL, True):
+            handler.on_chain_start({}, inputs)
+            
+        output = mock_print.call_args.args[0]
+        assert "Qu'est-ce qu'un colérique ?" in output
+        assert "Impossible de recuperer le prompt" not in output
         
     def test_get_chunks_collector(self):
         """Test getting chunks collector"""
@@ -110,7 +143,7 @@ class TestStreamlitCallbackHandler:
     def test_on_llm_new_token(self):
         """Test new token callback"""
         placeholder = Mock()
-        handler = StreamlitCallbackHandler(placeholder, update_every=1, delay=0)
+        handler = StreamlitCallbackHandler(placeholder, update_every=1, min_paint_interval=0)
         
         with patch('time.time', return_value=123.456):
             handler.on_llm_start({}, ["test"])
@@ -125,7 +158,7 @@ class TestStreamlitCallbackHandler:
     def test_on_llm_end(self):
         """Test LLM end callback"""
         placeholder = Mock()
-        handler = StreamlitCallbackHandler(placeholder, delay=0)
+        handler = StreamlitCallbackHandler(placeholder, min_paint_interval=0)
         
         with patch('time.time', side_effect=[100.0, 100.1, 100.5]):
             handler.on_llm_start({}, ["test"])
@@ -134,4 +167,45 @@ class TestStreamlitCallbackHandler:
             
         # Should display final text without cursor
         placeholder.markdown.assert_called_with("Hello")
-        assert handler.total_tokens == 1
\ No newline at end of file
+        assert handler.total_tokens == 1
+        
+    def test_first_token_caption(self):
+        """Test TTFT is captioned in its own placeholder without touching the answer"""
+        placeholder = Mock()
+        ttft_placeholder = Mock()
+        handler = StreamlitCallbackHandler(placeholder, min_paint_interval=0, ttft_placeholder=ttft_placeholder)
+        
+        with patch('time.time', side_effect=[100.0, 100.25]):
+            handler.on_llm_start({}, ["test"])
+            handler.on_llm_new_token("Hello")
+            
+        ttft_placeholder.caption.assert_called_once_with("First token: 250ms")
+        placeholder.markdown.assert_called_once_with("Hello▌")
+        
+    def test_repaints_throttled(self):
+        """Test tokens arriving within the paint interval are shown with a later repaint"""
+        placeholder = Mock()
+        handler = StreamlitCallbackHandler(placeholder, min_paint_interval=0.05)
+        
+        with patch('time.time', side_effect=[100.0, 100.01, 100.02, 100.1, 100.2]):
+            handler.on_llm_start({}, ["test"])
+            handler.on_llm_new_token("Hel")
+            handler.on_llm_new_token("lo")
+            handler.on_llm_new_token(" world")
+            handler.on_llm_end()
+            
+        painted = [call.args[0] for call in placeholder.markdown.call_args_list]
+        assert painted == ["Hel▌", "Hello world▌", "Hello world"]
+        
+    def test_repaints_when_tokens_pile_up(self):
+        """Test a repaint is forced once enough tokens are waiting"""
+        placeholder = Mock()
+        handler = StreamlitCallbackHandler(placeholder, min_paint_interval=10)
+        tokens = ["t"] * (1 + StreamlitCallbackHandler.MAX_PENDING_TOKENS)
+        
+        with patch('time.time', return_value=100.0):
+            for token in tokens:
+                handler.on_llm_new_token(token)
+            
+        assert placeholder.markdown.call_count == 2
+        assert handler.text == "".join(tokens)
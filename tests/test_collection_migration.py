@@ -8,6 +8,19 @@ from services.ui_service.chat_interface import ChatInterface
 from infrastructure.config.settings import get_config
 
 
+class MockSessionState(dict):
+    """Dict-backed session state supporting attribute access like st.session_state"""
+    
+    def __getattr__(self, key):
+        try:
+            return self[key]
+        except KeyError:
+            raise AttributeError(key)
+    
+    def __setattr__(self, key, value):
+        self[key] = value
+
+
 class TestCollectionMigration:
     """Test collection name migration functionality"""
     
@@ -82,6 +95,37 @@ class TestCollectionMigration:
             # Should use default
             assert result == self.config.vectorstore.default_collection_key
     
+    def test_validated_session_keeps_valid_selection(self):
+        """Test that a session already flagged as validated keeps a valid selection"""
+        session_state = MockSessionState(collection_migrated=True, selected_collection="original")
+        
+        with patch('streamlit.session_state', session_state):
+            result = self.chat_interface.get_selected_collection()
+            
+        assert result == "original"
+        assert session_state["selected_collection"] == "original"
+    
+    def test_validated_session_still_rejects_unknown_selection(self):
+        """Test that an unknown value falls back to the default even after validation"""
+        session_state = MockSessionState(collection_migrated=True, selected_collection="invalid_collection")
+        
+        with patch('streamlit.session_state', session_state):
+            result = self.chat_interface.get_selected_collection()
+            
+        assert result == self.config.vectorstore.default_collection_key
+        assert session_state["selected_collection"] == self.config.vectorstore.default_collection_key
+    
+    def test_unvalidated_session_migrated_then_flagged(self):
+        """Test that the first call migrates a legacy value and flags the session"""
+        session_state = MockSessionState(selected_collection="Original (Character-based)")
+        
+        with patch('streamlit.session_state', session_state):
+            result = self.chat_interface.get_selected_collection()
+            
+        assert result == "original"
+        assert session_state["selected_collection"] == "original"
+        assert session_state["collection_migrated"]
+    
     def test_collection_options_list_integrity(self):
         """Test that collection options list matches config"""
         collections = list(self.config.vectorstore.collections.keys())
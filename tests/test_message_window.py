@@ -0,0 +1,74 @@
+"""
+Tests for the rendered message window of the current conversation
+"""
+
+import pytest
+from unittest.mock import patch
+from services.chat_service.conversation_manager import ConversationManager
+from infrastructure.config.settings import get_config
+
+
+class TestMessageWindow:
+    """Test message window slicing and expansion"""
+    
+    def setup_method(self):
+        """Set up test environment"""
+        self.config = get_config()
+        self.page = self.config.ui.max_rendered_messages
+        self.manager = ConversationManager()
+        # Guest keys: conversations live under "conversations"
+        self.user_patcher = patch.object(ConversationManager, '_get_current_user_id', return_value=None)
+        self.user_patcher.start()
+        
+        self.session_state = {
+            "current_conversation_guest": "conversation 1",
+            "conversations": {
+                "conversation 1": {"messages": [{"content": f"m{i}"} for i in range(5)]},
+                "conversation 2": {"messages": [{"content": f"n{i}"} for i in range(5)]}
+            }
+        }
+        self.st_patcher = patch('streamlit.session_state', self.session_state)
+        self.st_patcher.start()
+    
+    def teardown_method(self):
+        """Clean up test environment"""
+        self.st_patcher.stop()
+        self.user_patcher.stop()
+    
+    def test_limit_returns_most_recent_messages(self):
+        """Test that a limit keeps the latest messages in chronological order"""
+        messages = self.manager.get_current_messages(limit=2)
+        
+        assert [m["content"] for m in messages] == ["m3", "m4"]
+    
+    def test_limit_edge_cases(self):
+        """Test that no limit or a large limit returns everything and zero returns nothing"""
+        all_messages = self.session_state["conversations"]["conversation 1"]["messages"]
+        
+        assert self.manager.get_current_messages() is all_messages
+        assert self.manager.get_current_messages(limit=10) is all_messages
+        assert self.manager.get_current_messages(limit=0) == []
+    
+    def test_window_grows_per_conversation(self):
+        """Test that expanding the window only affects the current conversation"""
+        assert self.manager.get_message_window() == self.page
+        
+        self.manager.expand_message_window()
+        self.manager.expand_message_window()
+        assert self.manager.get_message_window() == 3 * self.page
+        
+        # Other conversations keep the default window
+        self.session_state["current_conversation_guest"] = "conversation 2"
+        assert self.manager.get_message_window() == self.page
+    
+    def test_window_cleared_with_conversations(self):
+        """Test that resetting the session drops the expanded window"""
+        self.manager.expand_message_window()
+        
+        self.manager.reset_session_state()
+        assert "conversations" not in self.session_state
+        assert self.manager.get_message_window() == self.page
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])